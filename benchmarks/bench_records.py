@@ -0,0 +1,86 @@
+"""Memory/allocation comparison of dict-based vs slotted records for shows, MAL info and events.
+
+Run from the repository root: python benchmarks/bench_records.py [show_count]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from records import CalendarEvent, MalInfo, Show
+
+PROVIDERS = ["Crunchyroll", "HiDive", "Netflix", "Hulu"]
+GENRES = ["Action", "Comedy", "Drama", "Fantasy", "Romance", "Sci-Fi"]
+EVENTS_PER_SHOW = 10
+
+def fresh(text):
+    # Simulate strings freshly decoded from JSON/HTML rather than shared literals
+    return "".join(list(text))
+
+def description(info):
+    lines = [f"Rating: {info['rating']}", f"Streaming: {', '.join(info['streaming'])}", f"Genres: {', '.join(info['genres'])}"]
+    return "\n".join(lines)
+
+def build_dicts(count):
+    start = date(2026, 1, 5)
+    shows, infos, events = [], {}, []
+    for i in range(count):
+        show = {"name": f"Show {i}", "current": 3, "total": 12, "suspended": False, "mal_link": f"https://myanimelist.net/anime/{i}/Show"}
+        info = {
+            "streaming": [fresh(PROVIDERS[i % 4])], "broadcast": "", "producers": [], "studios": [],
+            "source": fresh("Manga"), "genres": [fresh(GENRES[i % 6]), fresh(GENRES[(i + 1) % 6])], "theme": [],
+            "demographic": fresh("Shounen"), "duration": fresh("24 min"), "rating": fresh("PG-13")
+        }
+        shows.append(show)
+        infos[show["mal_link"]] = info
+        for ep in range(EVENTS_PER_SHOW):
+            day = (start + timedelta(weeks=ep)).strftime("%Y-%m-%d")
+            events.append({
+                "summary": f"🍥{show['name']} S01E{ep + 4:02d} (Expected)",
+                "description": description(info),
+                "start": {"date": day},
+                "end": {"date": day},
+                "colorId": "1"
+            })
+    return shows, infos, events
+
+def build_records(count):
+    start = date(2026, 1, 5)
+    shows, infos, events = [], {}, []
+    for i in range(count):
+        show = Show(name=f"Show {i}", section="Currently Streaming SimulDubbed Anime", mal_link=f"https://myanimelist.net/anime/{i}/Show", day="Monday", current=3, total=12)
+        info = MalInfo.create(
+            streaming=[fresh(PROVIDERS[i % 4])], source=fresh("Manga"),
+            genres=[fresh(GENRES[i % 6]), fresh(GENRES[(i + 1) % 6])],
+            demographic=fresh("Shounen"), duration=fresh("24 min"), rating=fresh("PG-13")
+        )
+        shows.append(show)
+        infos[show.mal_link] = info
+        for ep in range(EVENTS_PER_SHOW):
+            events.append(CalendarEvent(
+                summary=f"🍥{show.name} S01E{ep + 4:02d} (Expected)",
+                date=start + timedelta(weeks=ep),
+                color_id="1",
+                mal_info=info
+            ))
+    return shows, infos, events
+
+def measure(build, count):
+    tracemalloc.start()
+    result = build(count)
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    del result
+    return current, peak, blocks
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{count} shows, {count * EVENTS_PER_SHOW} events")
+    baseline = measure(build_dicts, count)
+    slotted = measure(build_records, count)
+    for label, (current, peak, blocks) in (("dicts", baseline), ("records", slotted)):
+        print(f"{label:>8}: {current / 2**20:8.1f} MiB retained, {peak / 2**20:8.1f} MiB peak, {blocks:9d} live blocks")
+    print(f"savings: {1 - slotted[0] / baseline[0]:.0%} memory, {1 - slotted[2] / baseline[2]:.0%} blocks")
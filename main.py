@@ -9,6 +9,16 @@ import json
 import hashlib
 import aiosqlite
 import logging
+import socket
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from forum_parser import parse_forum_post
+from job_queue import JobQueue
+from publish import load_targets, publish
+from records import CalendarEvent, MalInfo, EMPTY_MAL_INFO
+from utils import MetadataCache, fetch_page, ensure_metadata_table, METADATA_COLUMNS
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -42,8 +52,18 @@ STREAMING_PROVIDERS = {
     "Muse Asia": None
 }
 
-# Cache for MAL data to avoid duplicate requests
-MAL_CACHE = {}
+# Google Calendar color IDs
+AVAILABLE_COLORS = ["1", "2", "3", "5", "6", "7", "9", "10"]
+SUSPENDED_COLOR = "4"
+UPCOMING_COLOR = "11"
+DAY_MAP = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
+
+# Cache for MAL data to avoid duplicate requests (bounded LRU in front of the SQLite metadata table)
+MAL_CACHE = MetadataCache(
+    db_path="shows.db",
+    max_entries=int(os.getenv("MAL_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("MAL_CACHE_TTL", str(24 * 3600)))
+)
 
 # Scrape the forum post
 url = "https://myanimelist.net/forum/?topicid=1692966"
@@ -60,97 +80,27 @@ if first_comment is None:
 
 logger.info(f"First comment snippet: {first_comment.text[:200]}")
 
-# Parse ongoing schedule from forum using BeautifulSoup
+# Parse every section of the first post in a single pass
+forum_post = parse_forum_post(first_comment)
+
+# Ongoing schedule keyed by weekday
 def parse_ongoing_schedule():
-    schedule = {}
-    current_day = None
-    day_map = {"Monday": 0, "Tuesday": 1, "Wednesday": 2, "Thursday": 3, "Friday": 4, "Saturday": 5, "Sunday": 6}
-
-    # Find the section for "Currently Streaming SimulDubbed Anime" with flexible matching
-    streaming_section = soup.find(lambda tag: tag.name == 'b' and re.search(r"Currently\s+Streaming\s+SimulDubbed\s+Anime", tag.text, re.IGNORECASE))
-    if not streaming_section:
-        logger.warning("Could not find 'Currently Streaming SimulDubbed Anime' section.")
-        return schedule
-
-    # Find the next <ul> element after the section title
-    ul_element = streaming_section.find_next('ul')
-    if not ul_element:
-        logger.warning("No top-level <ul> element found after 'Currently Streaming SimulDubbed Anime' section.")
-        return schedule
-
-    # Process each <li> in the top-level <ul> (each <li> represents a day)
-    for li in ul_element.find_all('li', recursive=False):
-        # Extract the day of the week (e.g., "Monday", "Tuesday")
-        # The day is the first non-tag text in the <li>
-        day_text = None
-        for content in li.contents:
-            if isinstance(content, str):
-                day_text = content.strip()
-                break
-        if day_text and day_text in day_map:
-            current_day = day_text
-            schedule[current_day] = []
-
-        # Find the nested <ul> containing the shows for this day
-        nested_ul = li.find('ul')
-        if nested_ul and current_day:
-            # Process each <li> in the nested <ul> (each <li> represents a show)
-            for show_li in nested_ul.find_all('li', recursive=False):
-                show_info = show_li.get_text(strip=True)
-                if show_info and "Episodes:" in show_info:
-                    match = re.match(r"(.+?)\s*\(Episodes:\s*(\d+)(?:/(\d+|\?{3}))?\)\s*(\*\*)?", show_info)
-                    if match:
-                        name, current_ep, total_ep, suspended = match.groups()
-                        current_ep = int(current_ep)
-                        if total_ep == "???":
-                            total_ep = 24 if current_ep < 20 else 56
-                        else:
-                            total_ep = int(total_ep) if total_ep and total_ep != "?" else None
-                        mal_link = show_li.find('a', href=re.compile(r"https://myanimelist.net/anime/"))
-                        mal_link = mal_link['href'] if mal_link else None
-                        schedule[current_day].append({
-                            "name": name.strip(),
-                            "current": current_ep,
-                            "total": total_ep,
-                            "suspended": suspended == "**",
-                            "mal_link": mal_link
-                        })
-                    else:
-                        logger.warning(f"Could not parse show info from: {show_info}")
+    schedule = forum_post.ongoing_by_day()
+    for shows in schedule.values():
+        for show in shows:
+            if show.total_unknown:
+                show.total = 24 if show.current < 20 else 56
 
     logger.info(f"Parsed ongoing schedule with {sum(len(shows) for shows in schedule.values())} shows across {len(schedule)} days.")
     return schedule
 
-# Parse upcoming sections from forum (unchanged)
+# Upcoming sections (every "Upcoming ..." heading in the post, whatever the season)
 def parse_upcoming_events():
-    upcoming = []
-    current_section = None
-    date_pattern = re.compile(r"(\w+ \d{1,2}, \d{4})")
-
-    for line in first_comment.text.strip().split("\n"):
-        line = line.strip()
-        if "Upcoming SimulDubbed Anime for Winter 2025" in line or "Upcoming SimulDubbed Anime for Spring 2025" in line or "Upcoming Dubbed Anime" in line:
-            current_section = line
-        elif line and current_section and not line.startswith("* -"):
-            match = date_pattern.search(line)
-            is_theatrical = line.endswith("*")
-            mal_link_match = re.search(r'<a href="https?://myanimelist\.net/anime/(\d+)/[^"]+"[^>]*>([^<]+)</a>', line)
-            name = mal_link_match.group(2) if mal_link_match else line.split(" - ")[0].strip() if " - " in line else line.rstrip("*").strip()
-            mal_link = mal_link_match.group(0) if mal_link_match else None
-            date_str = match.group(1) if match else None
-            upcoming.append({
-                "name": name,
-                "date": date_str,
-                "theatrical": is_theatrical,
-                "section": current_section,
-                "mal_link": mal_link
-            })
-    return upcoming
+    return forum_post.of_kind("upcoming")
 
 # Scrape MAL for metadata (async)
 async def fetch_mal_page(session, url):
-    async with session.get(url, headers=headers) as response:
-        return await response.text()
+    return await fetch_page(session, url)
 
 async def get_mal_info(mal_link=None, name=None):
     if not mal_link and not name:
@@ -160,7 +110,10 @@ async def get_mal_info(mal_link=None, name=None):
     # If mal_link is provided, extract the URL; otherwise, search using the name
     if mal_link:
         match = re.search(r'href="([^"]+)"', mal_link)
-        if not match:
+        if not match and mal_link.startswith("http"):
+            mal_url = mal_link
+            cache_key = mal_url
+        elif not match:
             logger.warning(f"Invalid mal_link format: {mal_link}. Falling back to name search.")
             mal_url = None
         else:
@@ -187,10 +140,9 @@ async def get_mal_info(mal_link=None, name=None):
         logger.warning(f"Could not determine MAL URL for name: {name}")
         return None
 
-    if cache_key in MAL_CACHE:
-        logger.info(f"Cache hit for {cache_key}")
-        return MAL_CACHE[cache_key]
+    return await MAL_CACHE.get(cache_key, lambda: fetch_mal_info(mal_url))
 
+async def fetch_mal_info(mal_url):
     logger.info(f"Fetching MAL page: {mal_url}")
     async with aiohttp.ClientSession() as session:
         mal_response = await fetch_mal_page(session, mal_url)
@@ -219,122 +171,112 @@ async def get_mal_info(mal_link=None, name=None):
     rating = mal_soup.select_one(".spaceit_pad:-soup-contains('Rating:')")
     rating = rating.text.strip().replace("Rating:", "").strip() if rating else "Not Listed"
 
-    result = {
-        "streaming": streaming_list,
-        "broadcast": broadcast,
-        "producers": producers,
-        "studios": studios,
-        "source": source,
-        "genres": genres,
-        "theme": theme,
-        "demographic": demographic,
-        "duration": duration,
-        "rating": rating
-    }
-    MAL_CACHE[cache_key] = result
-    return result
+    return MalInfo.create(
+        streaming=streaming_list,
+        broadcast=broadcast,
+        producers=producers,
+        studios=studios,
+        source=source,
+        genres=genres,
+        theme=theme,
+        demographic=demographic,
+        duration=duration,
+        rating=rating
+    )
 
 async def process_mal_info(shows):
     tasks = []
     for show in shows:
-        mal_link = show.get("mal_link")
-        name = show.get("name", show.get("title", "Unknown Show"))
-        tasks.append(get_mal_info(mal_link, name))
-    results = await asyncio.gather(*tasks)
-    mal_info = {show["name"]: info for show, info in zip(shows, results) if info}
+        tasks.append(get_mal_info(show.mal_link, show.name))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    MAL_CACHE.log_stats()
+    for show, info in zip(shows, results):
+        if isinstance(info, Exception):
+            logger.warning(f"Failed to fetch MAL info for {show.name}: {info}")
+    mal_info = {show.name: info for show, info in zip(shows, results) if info and not isinstance(info, Exception)}
     logger.info(f"Processed MAL info for {len(mal_info)} shows: {list(mal_info.keys())[:5]}")  # Log first 5 keys
     return mal_info
 
 # Load metadata from SQLite with verification (unchanged)
 async def load_metadata():
     async with aiosqlite.connect("shows.db") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS metadata (
-                mal_link TEXT PRIMARY KEY,
-                streaming TEXT,
-                broadcast TEXT,
-                producers TEXT,
-                studios TEXT,
-                source TEXT,
-                genres TEXT,
-                theme TEXT,
-                demographic TEXT,
-                duration TEXT,
-                rating TEXT
-            )
-        """)
+        await ensure_metadata_table(db)
         await db.commit()
-        cursor = await db.execute("SELECT mal_link, streaming, broadcast, producers, studios, source, genres, theme, demographic, duration, rating FROM metadata")
+        cursor = await db.execute(f"SELECT {', '.join(METADATA_COLUMNS)} FROM metadata")
         rows = await cursor.fetchall()
         logger.info(f"Loaded {len(rows)} rows from metadata table")
-        return {row[0]: {
-            "streaming": json.loads(row[1]) if row[1] else [],
-            "broadcast": row[2] if row[2] else "",
-            "producers": json.loads(row[3]) if row[3] else [],
-            "studios": json.loads(row[4]) if row[4] else [],
-            "source": row[5] if row[5] else "",
-            "genres": json.loads(row[6]) if row[6] else [],
-            "theme": json.loads(row[7]) if row[7] else [],
-            "demographic": row[8] if row[8] else "",
-            "duration": row[9] if row[9] else "",
-            "rating": row[10] if row[10] else ""
-        } for row in rows}
-
-# Update metadata in SQLite with detailed logging (unchanged)
-async def update_metadata(shows):
-    mal_info = await process_mal_info(shows)
-    async with aiosqlite.connect("shows.db") as db:
+        return {row[0]: MalInfo.from_row(row[1:]) for row in rows}
+
+# Metadata refresh jobs live in shows.db so several processes can work through them together
+METADATA_QUEUE = JobQueue(
+    db_path="shows.db",
+    lease_seconds=int(os.getenv("METADATA_LEASE_SECONDS", "120")),
+    max_attempts=int(os.getenv("METADATA_MAX_ATTEMPTS", "5")),
+    retry_base_seconds=int(os.getenv("METADATA_RETRY_BASE_SECONDS", "30"))
+)
+# Worker coroutines per process; they share this process's MAL_RATE_LIMITER
+METADATA_CONCURRENCY = int(os.getenv("METADATA_CONCURRENCY", "4"))
+
+async def keep_lease(queue, worker_id, mal_link):
+    delay = queue.lease_seconds / 3
+    while True:
+        await asyncio.sleep(delay)
         try:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS metadata (
-                    mal_link TEXT PRIMARY KEY,
-                    streaming TEXT,
-                    broadcast TEXT,
-                    producers TEXT,
-                    studios TEXT,
-                    source TEXT,
-                    genres TEXT,
-                    theme TEXT,
-                    demographic TEXT,
-                    duration TEXT,
-                    rating TEXT
-                )
-            """)
-            inserted_rows = 0
-            for show in shows:
-                mal_link = show.get("mal_link")
-                if mal_link and mal_info.get(show["name"]):
-                    info = mal_info[show["name"]]
-                    logger.info(f"Attempting to insert: {show['name']} with mal_link {mal_link} and streaming {info.get('streaming', [])}")
-                    await db.execute("""
-                        INSERT OR REPLACE INTO metadata (mal_link, streaming, broadcast, producers, studios, source, genres, theme, demographic, duration, rating)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        mal_link,
-                        json.dumps(info["streaming"]),
-                        info["broadcast"],
-                        json.dumps(info["producers"]),
-                        json.dumps(info["studios"]),
-                        info["source"],
-                        json.dumps(info["genres"]),
-                        json.dumps(info["theme"]),
-                        info["demographic"],
-                        info["duration"],
-                        info["rating"]
-                    ))
-                    inserted_rows += 1
-                    logger.info(f"Inserted/Updated metadata for {show['name']} with mal_link {mal_link}")
-                else:
-                    logger.warning(f"Skipped {show['name']} due to missing mal_link or mal_info")
-            await db.commit()
-            logger.info(f"Attempted to insert {inserted_rows} rows into metadata table")
-            # Verify insertion
-            cursor = await db.execute("SELECT COUNT(*) FROM metadata")
-            row_count = (await cursor.fetchone())[0]
-            logger.info(f"Database now contains {row_count} rows")
+            held = await queue.heartbeat(worker_id, mal_link)
+        except sqlite3.OperationalError as e:
+            # Usually "database is locked" while another process writes; retry well before the lease runs out
+            logger.warning(f"{worker_id} heartbeat for {mal_link} failed, retrying: {e}")
+            delay = min(5, queue.lease_seconds / 10)
+            continue
+        if not held:
+            logger.warning(f"{worker_id} lost its lease on {mal_link}")
+            return
+        delay = queue.lease_seconds / 3
+
+async def metadata_worker(queue, worker_prefix, n):
+    worker_id = f"{worker_prefix}{n}"
+    processed = 0
+    while True:
+        job = await queue.claim(worker_id)
+        if job is None:
+            # Wait for a retry backoff or another process's lease to run out; jobs leased in this process are left to their worker
+            wait = await queue.next_claimable(worker_prefix)
+            if wait is None:
+                break
+            # Re-check periodically since other processes may fail jobs back to pending
+            await asyncio.sleep(min(wait, 15))
+            continue
+        mal_link, name = job
+        heartbeat = asyncio.create_task(keep_lease(queue, worker_id, mal_link))
+        try:
+            # MAL_CACHE persists freshly fetched rows itself; DB-tier hits keep their original fetched_at
+            info = await get_mal_info(mal_link, name)
+            if info is None:
+                raise ValueError("no MAL info found")
+            await queue.complete(worker_id, mal_link)
+            processed += 1
+            logger.info(f"{worker_id} refreshed metadata for {name} with mal_link {mal_link} and streaming {list(info.streaming)}")
         except Exception as e:
-            logger.error(f"Database error: {e}")
-            raise
+            logger.warning(f"{worker_id} failed {name} ({mal_link}): {e}")
+            await queue.fail(worker_id, mal_link, e)
+        finally:
+            heartbeat.cancel()
+    return processed
+
+async def run_metadata_workers(queue):
+    worker_prefix = f"{socket.gethostname()}-{os.getpid()}-"
+    processed = await asyncio.gather(*(metadata_worker(queue, worker_prefix, n) for n in range(METADATA_CONCURRENCY)))
+    MAL_CACHE.log_stats()
+    logger.info(f"Processed {sum(processed)} metadata jobs in this process; queue now {await queue.counts()}")
+
+# Update metadata in SQLite through the shared job queue; an interrupted refresh resumes where it stopped
+async def update_metadata(shows):
+    await METADATA_QUEUE.start_refresh(shows)
+    await run_metadata_workers(METADATA_QUEUE)
+    async with aiosqlite.connect("shows.db") as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM metadata")
+        row_count = (await cursor.fetchone())[0]
+        logger.info(f"Database now contains {row_count} rows")
     logger.info("Metadata update process completed")
 
 # Weekly update (no Google Calendar dependency) (unchanged)
@@ -370,138 +312,70 @@ def initialize_calendar():
 
 def get_color_id(show_name, day_shows, used_colors):
     hash_value = int(hashlib.md5(show_name.encode()).hexdigest(), 16)
-    color_index = hash_value % len(available_colors)
-    base_color = available_colors[color_index]
-    if base_color in used_colors and len(used_colors) < len(available_colors):
-        for color in available_colors:
+    color_index = hash_value % len(AVAILABLE_COLORS)
+    base_color = AVAILABLE_COLORS[color_index]
+    if base_color in used_colors and len(used_colors) < len(AVAILABLE_COLORS):
+        for color in AVAILABLE_COLORS:
             if color not in used_colors:
                 return color
     return base_color
 
-def batch_insert_events(service, events):
-    if service:
-        batch = service.new_batch_http_request()
-        for event in events:
-            batch.add(service.events().insert(calendarId=calendar_id, body=event))
-        batch.execute()
-
-def clear_future_events(service):
-    if service:
-        current_date = datetime.now()
-        today = current_date.date()
-        page_token = None
-        while True:
-            events = service.events().list(calendarId=calendar_id, pageToken=page_token).execute()
-            for event in events["items"]:
-                start = event["start"].get("date") or event["start"].get("dateTime")
-                if start:
-                    event_date = datetime.strptime(start[:10], "%Y-%m-%d").date()
-                    if event_date > today:
-                        service.events().delete(calendarId=calendar_id, eventId=event["id"]).execute()
-            page_token = events.get("nextPageToken")
-            if not page_token:
-                break
-
 def next_weekday(start_date, weekday):
     days_ahead = weekday - start_date.weekday()
     if days_ahead < 0:
         days_ahead += 7
     return start_date + timedelta(days_ahead)
 
+def resolve_provider(name, streaming):
+    """Return (main provider, emoji, description prefix) for a show."""
+    manual = MANUAL_STREAMING.get(name)
+    if manual:
+        return manual["provider"], manual["emoji"], f"[Dub: {manual['dub']}]" if manual.get("dub") else ""
+    main_provider = next((p for p in STREAMING_PROVIDERS if any(p.lower() == s.lower() for s in streaming)), None)
+    emoji = STREAMING_PROVIDERS.get(main_provider, "⛔") if main_provider else "⛔"
+    return main_provider, emoji, ""
+
 async def process_ongoing_events(ongoing_data, metadata):
     ongoing_events = []
     current_date = datetime.now()
     today = current_date.date()
-    available_colors = ["1", "2", "3", "5", "6", "7", "9", "10"]
-    suspended_color = "4"
-    upcoming_color = "11"
     for day, shows in ongoing_data.items():
-        day_index = day_map[day]
+        day_index = DAY_MAP[day]
         used_colors = set()
-        mal_infos = await process_mal_info(shows) if not metadata else {show["name"]: metadata.get(show["mal_link"]) for show in shows}
-        for show, mal_info in zip(shows, [mal_infos.get(show["name"], {}) for show in shows]):
-            latest_episode = show["current"]
-            total_ep = show["total"] or 10
+        mal_infos = await process_mal_info(shows) if not metadata else {show.name: metadata.get(show.mal_link) for show in shows}
+        for show in shows:
+            mal_info = mal_infos.get(show.name) or EMPTY_MAL_INFO
+            latest_episode = show.current
+            total_ep = show.total or 10
             base_date = next_weekday(current_date, day_index)
-            streaming = mal_info.get("streaming", [])
-            manual = MANUAL_STREAMING.get(show["name"])
-            if manual:
-                main_provider = manual["provider"]
-                emoji = manual["emoji"]
-                description_part = f"[Dub: {manual['dub']}]" if manual.get("dub") else ""
-            else:
-                main_provider = next((p for p in STREAMING_PROVIDERS if any(p.lower() == s.lower() for s in streaming)), None)
-                emoji = STREAMING_PROVIDERS.get(main_provider, "⛔") if main_provider else "⛔"
-                description_part = ""
-            logger.info(f"Show: {show['name']}, Main Provider: {main_provider}, Emoji: {emoji}")
-            color_id = suspended_color if show["suspended"] else get_color_id(show["name"], shows, used_colors)
-            if not show["suspended"]:
+            main_provider, emoji, description_part = resolve_provider(show.name, mal_info.streaming)
+            logger.info(f"Show: {show.name}, Main Provider: {main_provider}, Emoji: {emoji}")
+            color_id = SUSPENDED_COLOR if show.suspended else get_color_id(show.name, shows, used_colors)
+            if not show.suspended:
                 used_colors.add(color_id)
-            if show["suspended"]:
+            if show.suspended:
                 if base_date.date() >= today:
-                    description_lines = [f"Rating: {mal_info.get('rating', 'Not Listed')}"]
-                    if streaming:
-                        description_lines.append(f"Streaming: {', '.join(streaming)}")
-                    if mal_info.get("broadcast"):
-                        description_lines.append(f"Broadcast: {mal_info['broadcast']}")
-                    if mal_info.get("genres"):
-                        description_lines.append(f"Genres: {', '.join(mal_info['genres'])}")
-                    if mal_info.get("theme"):
-                        description_lines.append(f"Theme: {', '.join(mal_info['theme'])}")
-                    if mal_info.get("studios"):
-                        description_lines.append(f"Studios: {', '.join(mal_info['studios'])}")
-                    if mal_info.get("producers"):
-                        description_lines.append(f"Producers: {', '.join(mal_info['producers'])}")
-                    if mal_info.get("source"):
-                        description_lines.append(f"Source: {mal_info['source']}")
-                    if mal_info.get("demographic"):
-                        description_lines.append(f"Demographic: {mal_info['demographic']}")
-                    if mal_info.get("duration"):
-                        description_lines.append(f"Duration: {mal_info['duration']}")
-                    description = f"{description_part}\n** = Dub production suspended until further notice.\n" + "\n".join(description_lines)
-
-                    event = {
-                        "summary": f"{emoji}{show['name']} (Suspended) [Latest Episode {latest_episode}/{total_ep or '?'}]",
-                        "description": description,
-                        "start": {"date": base_date.strftime("%Y-%m-%d")},
-                        "end": {"date": base_date.strftime("%Y-%m-%d")},
-                        "recurrence": ["RRULE:FREQ=WEEKLY"],
-                        "colorId": color_id
-                    }
-                    ongoing_events.append(event)
+                    ongoing_events.append(CalendarEvent(
+                        summary=f"{emoji}{show.name} (Suspended) [Latest Episode {latest_episode}/{total_ep or '?'}]",
+                        date=base_date.date(),
+                        color_id=color_id,
+                        mal_info=mal_info,
+                        notes=(description_part, "** = Dub production suspended until further notice."),
+                        recurrence="RRULE:FREQ=WEEKLY",
+                        provider=main_provider
+                    ))
             else:
                 for ep in range(latest_episode + 1, min(total_ep + 1, latest_episode + 11)):
                     ep_date = base_date + timedelta(weeks=(ep - latest_episode - 1))
                     if ep_date.date() >= today:
-                        description_lines = [f"Rating: {mal_info.get('rating', 'Not Listed')}"]
-                        if streaming:
-                            description_lines.append(f"Streaming: {', '.join(streaming)}")
-                        if mal_info.get("broadcast"):
-                            description_lines.append(f"Broadcast: {mal_info['broadcast']}")
-                        if mal_info.get("genres"):
-                            description_lines.append(f"Genres: {', '.join(mal_info['genres'])}")
-                        if mal_info.get("theme"):
-                            description_lines.append(f"Theme: {', '.join(mal_info['theme'])}")
-                        if mal_info.get("studios"):
-                            description_lines.append(f"Studios: {', '.join(mal_info['studios'])}")
-                        if mal_info.get("producers"):
-                            description_lines.append(f"Producers: {', '.join(mal_info['producers'])}")
-                        if mal_info.get("source"):
-                            description_lines.append(f"Source: {mal_info['source']}")
-                        if mal_info.get("demographic"):
-                            description_lines.append(f"Demographic: {mal_info['demographic']}")
-                        if mal_info.get("duration"):
-                            description_lines.append(f"Duration: {mal_info['duration']}")
-                        description = f"{description_part}\n" + "\n".join(description_lines) if description_lines else description_part
-
-                        event = {
-                            "summary": f"{emoji}{show['name']} S{(latest_episode // 100) + 1:02d}E{ep:02d} (Expected)",
-                            "description": description,
-                            "start": {"date": ep_date.strftime("%Y-%m-%d")},
-                            "end": {"date": ep_date.strftime("%Y-%m-%d")},
-                            "colorId": color_id
-                        }
-                        ongoing_events.append(event)
+                        ongoing_events.append(CalendarEvent(
+                            summary=f"{emoji}{show.name} S{(latest_episode // 100) + 1:02d}E{ep:02d} (Expected)",
+                            date=ep_date.date(),
+                            color_id=color_id,
+                            mal_info=mal_info,
+                            notes=(description_part,),
+                            provider=main_provider
+                        ))
     logger.info(f"Processed {len(ongoing_events)} ongoing events")
     return ongoing_events
 
@@ -509,80 +383,47 @@ async def process_upcoming_events(upcoming_data, metadata):
     upcoming_events = []
     current_date = datetime.now()
     today = current_date.date()
-    available_colors = ["1", "2", "3", "5", "6", "7", "9", "10"]
-    upcoming_color = "11"
-    mal_infos = await process_mal_info(upcoming_data) if not metadata else {item["name"]: metadata.get(item["mal_link"]) for item in upcoming_data}
-    for item, mal_info in zip(upcoming_data, [mal_infos.get(item["name"], {}) for item in upcoming_data]):
-        if item["date"]:
-            event_date = datetime.strptime(item["date"], "%B %d, %Y").date()
+    mal_infos = await process_mal_info(upcoming_data) if not metadata else {item.name: metadata.get(item.mal_link) for item in upcoming_data}
+    for item in upcoming_data:
+        if item.date:
+            event_date = datetime.strptime(item.date, "%B %d, %Y").date()
             if event_date >= today:
-                streaming = mal_info.get("streaming", [])
-                manual = MANUAL_STREAMING.get(item["name"])
-                if manual:
-                    main_provider = manual["provider"]
-                    emoji = manual["emoji"]
-                    description_part = f"[Dub: {manual['dub']}]" if manual.get("dub") else ""
-                else:
-                    main_provider = next((p for p in STREAMING_PROVIDERS if any(p.lower() == s.lower() for s in streaming)), None)
-                    emoji = STREAMING_PROVIDERS.get(main_provider, "⛔") if main_provider else "⛔"
-                    description_part = ""
-                logger.info(f"Upcoming: {item['name']}, Main Provider: {main_provider}, Emoji: {emoji}")
-                summary = f"🎟️{item['name']}" if item["theatrical"] else f"{emoji}{item['name']}"
-                description_lines = [f"Rating: {mal_info.get('rating', 'Not Listed')}"]
-                if streaming:
-                    description_lines.append(f"Streaming: {', '.join(streaming)}")
-                if mal_info.get("broadcast"):
-                    description_lines.append(f"Broadcast: {mal_info['broadcast']}")
-                if mal_info.get("genres"):
-                    description_lines.append(f"Genres: {', '.join(mal_info['genres'])}")
-                if mal_info.get("theme"):
-                    description_lines.append(f"Theme: {', '.join(mal_info['theme'])}")
-                if mal_info.get("studios"):
-                    description_lines.append(f"Studios: {', '.join(mal_info['studios'])}")
-                if mal_info.get("producers"):
-                    description_lines.append(f"Producers: {', '.join(mal_info['producers'])}")
-                if mal_info.get("source"):
-                    description_lines.append(f"Source: {mal_info['source']}")
-                if mal_info.get("demographic"):
-                    description_lines.append(f"Demographic: {mal_info['demographic']}")
-                if mal_info.get("duration"):
-                    description_lines.append(f"Duration: {mal_info['duration']}")
-                description = f"{description_part}\n{'🎟️ * = These are theatrical releases and not home/digital releases.' if item['theatrical'] else ''}\n" + "\n".join(description_lines)
-
-                event = {
-                    "summary": summary,
-                    "description": description,
-                    "start": {"date": event_date.strftime("%Y-%m-%d")},
-                    "end": {"date": event_date.strftime("%Y-%m-%d")},
-                    "colorId": upcoming_color
-                }
-                upcoming_events.append(event)
+                mal_info = mal_infos.get(item.name) or EMPTY_MAL_INFO
+                main_provider, emoji, description_part = resolve_provider(item.name, mal_info.streaming)
+                logger.info(f"Upcoming: {item.name}, Main Provider: {main_provider}, Emoji: {emoji}")
+                upcoming_events.append(CalendarEvent(
+                    summary=f"🎟️{item.name}" if item.theatrical else f"{emoji}{item.name}",
+                    date=event_date,
+                    color_id=UPCOMING_COLOR,
+                    mal_info=mal_info,
+                    notes=(description_part, "🎟️ * = These are theatrical releases and not home/digital releases." if item.theatrical else ""),
+                    provider=main_provider,
+                    theatrical=item.theatrical
+                ))
     logger.info(f"Processed {len(upcoming_events)} upcoming events")
     return upcoming_events
 
-# Daily update with Google Calendar (unchanged)
+# Daily update: build the event set once, then route it to every calendar target
 async def update_calendar():
-    service = initialize_calendar()
-    if not service:
+    targets = load_targets()
+    service = initialize_calendar() if any(target.calendar_id for target in targets) else None
+    if not service and not any(target.ics for target in targets):
         logger.info("Skipping calendar update due to missing credentials.")
         return
     ongoing_data = parse_ongoing_schedule()
     upcoming_data = parse_upcoming_events()
     metadata = await load_metadata()
-    clear_future_events(service)
     ongoing_events = await process_ongoing_events(ongoing_data, metadata)
-    if ongoing_events:
-        logger.info(f"Inserting {len(ongoing_events)} ongoing events")
-        batch_insert_events(service, ongoing_events)
     upcoming_events = await process_upcoming_events(upcoming_data, metadata)
-    if upcoming_events:
-        logger.info(f"Inserting {len(upcoming_events)} upcoming events")
-        batch_insert_events(service, upcoming_events)
+    publish(ongoing_events + upcoming_events, targets, service)
     logger.info("Calendar updated successfully!")
 
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == "update_calendar":
         asyncio.run(update_calendar())
+    elif len(sys.argv) > 1 and sys.argv[1] == "metadata_worker":
+        # Extra worker process: drain the queue another process started with update_shows
+        asyncio.run(run_metadata_workers(METADATA_QUEUE))
     else:
         asyncio.run(update_shows())
\ No newline at end of file
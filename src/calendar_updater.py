@@ -2,9 +2,11 @@ from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 import os
+import re
 from datetime import datetime, timedelta
-import yaml
+from forum_parser import sections_of_kind
 from scraper import scrape_forum_post, load_cached_data, save_cached_data, needs_update
+from utils import load_manual_overrides
 
 CALENDAR_ID = os.getenv("CALENDAR_ID")
 TIMEZONE = "UTC"
@@ -24,13 +26,6 @@ def get_calendar_service():
     creds = Credentials.from_authorized_user_file("credentials.json")
     return build("calendar", "v3", credentials=creds)
 
-def load_manual_overrides():
-    try:
-        with open("data/manual_overrides.yaml", "r") as f:
-            return yaml.safe_load(f) or {}
-    except FileNotFoundError:
-        return {}
-
 def get_next_day_date(day_name, ref_date=datetime.utcnow()):
     days_ahead = DAYS.index(day_name) - ref_date.weekday()
     if days_ahead <= 0:
@@ -81,13 +76,15 @@ def update_calendar():
                 create_event(service, "Parser Out Of Date", datetime.utcnow(), color="Banana", description="Time updated, no date change", all_day=False)
 
         # Process Currently Streaming
-        for day, shows in new_data["sections"]["Currently Streaming SimulDubbed Anime"].items():
+        ongoing = {day: shows for _, days in sections_of_kind(new_data["sections"], "ongoing") for day, shows in days.items()}
+        for day, shows in ongoing.items():
             next_date = get_next_day_date(day)
             for show in shows:
                 title = show["title"]
                 ep_current = show["current_episode"]
                 ep_total = show["total_episodes"] or (24 if ep_current < 20 else ep_current + 8)
-                season = "S01" if not re.search(r"Season \d+", title) else f"S{re.search(r'Season (\d+)', title).group(1):02d}"
+                season_match = re.search(r"Season (\d+)", title)
+                season = f"S{int(season_match.group(1)):02d}" if season_match else "S01"
                 streaming = normalize_provider(manual_overrides.get(show["mal_id"], {}).get("streaming", "HIDIVE"))  # Default to HIDIVE
                 emoji = STREAMING_EMOJIS.get(streaming, "⛔")
                 color = COLORS.get(streaming, "Lavender")  # Default for Crunchyroll or others
@@ -101,10 +98,12 @@ def update_calendar():
                         create_event(service, event_title, next_date + timedelta(weeks=ep - ep_current - 1), color=color)
 
         # Process Upcoming
-        for section in ["Upcoming SimulDubbed Anime for Winter 2025", "Upcoming SimulDubbed Anime for Spring 2025", "Upcoming Dubbed Anime"]:
-            for show in new_data["sections"][section]:
+        for _, shows in sections_of_kind(new_data["sections"], "upcoming"):
+            for show in shows:
+                if not show["date"]:
+                    continue
                 date = datetime.strptime(show["date"], "%B %d, %Y")
-                title = f"🎟 {show['title']} [Theatrical Release]" if "*" in show["title"] else show["title"]
+                title = f"🎟 {show['title']} [Theatrical Release]" if show["theatrical"] else show["title"]
                 create_event(service, title, date, all_day=True)
 
         save_cached_data(new_data)
@@ -0,0 +1,125 @@
+import re
+from dataclasses import dataclass, field
+
+from bs4 import NavigableString, Tag
+
+from records import Show
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Bold headings that open a list section, e.g. "Upcoming SimulDubbed Anime for Spring 2025"
+SECTION_PATTERN = re.compile(r"^(Currently Streaming|Upcoming|Released|Announced|Finished)\b.*\bAnime\b", re.IGNORECASE)
+EPISODES_PATTERN = re.compile(r"(.+?)\s*\(Episodes:\s*(\d+)(?:/(\d+|\?+))?\)\s*(\*\*)?")
+DATE_PATTERN = re.compile(r"([A-Z][a-z]+ \d{1,2}, \d{4})")
+MAL_ANIME_PATTERN = re.compile(r"https?://myanimelist\.net/anime/\d+")
+
+def section_kind(name):
+    """Classify a section heading as ongoing/upcoming/awaiting/announced/released/finished."""
+    name = name.lower()
+    if name.startswith("currently streaming"):
+        return "ongoing"
+    if name.startswith("upcoming"):
+        return "upcoming"
+    if "awaiting streaming" in name:
+        return "awaiting"
+    if name.startswith("announced"):
+        return "announced"
+    if name.startswith("finished"):
+        return "finished"
+    if name.startswith("released"):
+        return "released"
+    return None
+
+def sections_of_kind(sections, kind):
+    """Yield (name, value) for every section of the given kind, in document order."""
+    for name, value in sections.items():
+        if section_kind(name) == kind:
+            yield name, value
+
+@dataclass
+class ForumPost:
+    # Section heading -> shows in document order
+    sections: dict = field(default_factory=dict)
+
+    def of_kind(self, kind):
+        return [show for _, shows in sections_of_kind(self.sections, kind) for show in shows]
+
+    def ongoing_by_day(self):
+        schedule = {}
+        for show in self.of_kind("ongoing"):
+            schedule.setdefault(show.day, []).append(show)
+        return schedule
+
+def _text(tag):
+    return re.sub(r"\s+", " ", tag.get_text()).strip()
+
+def _own_text(li):
+    """The first direct text of an <li>, i.e. the label before any nested list."""
+    for child in li.children:
+        if isinstance(child, NavigableString) and child.strip():
+            return child.strip()
+    return None
+
+def _parse_entry(li, section, day):
+    text = _text(li)
+    if not text or text.startswith("*"):
+        return None
+    anchor = li.find("a", href=MAL_ANIME_PATTERN)
+    mal_link = anchor["href"] if anchor else None
+
+    if section_kind(section) == "ongoing":
+        match = EPISODES_PATTERN.match(text)
+        if not match or day is None:
+            return None
+        name, current, total, suspended = match.groups()
+        return Show(
+            name=name.strip(),
+            section=section,
+            mal_link=mal_link,
+            day=day,
+            current=int(current),
+            total=int(total) if total and total.isdigit() else None,
+            total_unknown=total == "???",
+            suspended=suspended == "**"
+        )
+
+    date_match = DATE_PATTERN.search(text)
+    if anchor:
+        name = _text(anchor)
+    elif " - " in text:
+        name = text.split(" - ")[0].strip()
+    else:
+        name = text.rstrip("*").strip()
+    return Show(
+        name=name,
+        section=section,
+        mal_link=mal_link,
+        date=date_match.group(1) if date_match else None,
+        theatrical=text.endswith("*") and not text.endswith("**")
+    )
+
+def parse_forum_post(post):
+    """Walk the first post's DOM once and collect the shows of every section."""
+    result = ForumPost()
+    section = None
+    day = None
+    for node in post.descendants:
+        if not isinstance(node, Tag):
+            continue
+        if node.name == "b" and node.find_parent("li") is None:
+            heading = _text(node)
+            if SECTION_PATTERN.match(heading):
+                section = heading
+                day = None
+                result.sections.setdefault(section, [])
+        elif node.name == "li" and section:
+            if node.find(["ul", "ol"]):
+                # Container item, e.g. a weekday holding the ongoing shows for that day
+                label = _own_text(node)
+                if label and label.split()[0] in DAYS:
+                    day = label.split()[0]
+                continue
+            show = _parse_entry(node, section, day)
+            if show:
+                result.sections[section].append(show)
+    return result
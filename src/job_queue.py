@@ -0,0 +1,157 @@
+import logging
+import time
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+JOBS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS metadata_jobs (
+        mal_link TEXT PRIMARY KEY,
+        name TEXT,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL,
+        last_error TEXT,
+        not_before REAL,
+        updated_at REAL
+    )
+"""
+
+class JobQueue:
+    """Metadata refresh jobs in the ``metadata_jobs`` table, shared by any number of worker processes.
+
+    Workers claim a job by taking a lease that they renew with ``heartbeat``; a job whose
+    lease runs out (crashed or killed worker) becomes claimable again. Jobs move
+    pending -> leased -> done, or back to pending on error until ``max_attempts`` is hit.
+    A failed job waits ``retry_base_seconds * 2 ** (attempts - 1)`` before it can be retried.
+    """
+
+    def __init__(self, db_path="shows.db", lease_seconds=120, max_attempts=5, retry_base_seconds=30):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+    def _connect(self):
+        # Autocommit mode so claim() can take the write lock up front with BEGIN IMMEDIATE
+        return aiosqlite.connect(self.db_path, timeout=30, isolation_level=None)
+
+    async def _ensure_table(self, db):
+        await db.execute(JOBS_SCHEMA)
+        # Tables created before retry backoff existed need the column added
+        cursor = await db.execute("PRAGMA table_info(metadata_jobs)")
+        if "not_before" not in {row[1] for row in await cursor.fetchall()}:
+            await db.execute("ALTER TABLE metadata_jobs ADD COLUMN not_before REAL")
+        await db.execute("CREATE INDEX IF NOT EXISTS metadata_jobs_status ON metadata_jobs (status, lease_expires)")
+
+    async def start_refresh(self, shows):
+        """Queue a refresh of these shows.
+
+        If the previous refresh still has unfinished jobs it is resumed and only new shows are
+        added; otherwise the finished jobs are cleared and exactly these shows are queued, so
+        shows that dropped off the forum post stop being refreshed.
+        """
+        now = time.time()
+        async with self._connect() as db:
+            await self._ensure_table(db)
+            await db.execute("BEGIN IMMEDIATE")
+            cursor = await db.execute("SELECT COUNT(*) FROM metadata_jobs WHERE status IN ('pending', 'leased')")
+            unfinished = (await cursor.fetchone())[0]
+            if not unfinished:
+                # Every remaining job is done or failed; the shows passed in are re-queued below
+                await db.execute("DELETE FROM metadata_jobs")
+            await db.executemany(
+                "INSERT OR IGNORE INTO metadata_jobs (mal_link, name, updated_at) VALUES (?, ?, ?)",
+                [(show.mal_link, show.name, now) for show in shows if show.mal_link]
+            )
+            await db.execute("COMMIT")
+        logger.info(f"{'Resuming' if unfinished else 'Starting'} metadata refresh ({unfinished} unfinished jobs carried over)")
+
+    async def claim(self, worker_id):
+        """Lease the next available job; returns (mal_link, name) or None."""
+        now = time.time()
+        async with self._connect() as db:
+            await self._ensure_table(db)
+            await db.execute("BEGIN IMMEDIATE")
+            # Expired leases that already used their last attempt are given up on
+            await db.execute(
+                "UPDATE metadata_jobs SET status = 'failed', lease_owner = NULL, updated_at = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            cursor = await db.execute(
+                """
+                SELECT mal_link, name FROM metadata_jobs
+                WHERE (status = 'pending' AND (not_before IS NULL OR not_before <= ?)) OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY attempts, updated_at
+                LIMIT 1
+                """,
+                (now, now)
+            )
+            job = await cursor.fetchone()
+            if job:
+                await db.execute(
+                    "UPDATE metadata_jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE mal_link = ?",
+                    (worker_id, now + self.lease_seconds, now, job[0])
+                )
+            await db.execute("COMMIT")
+        return tuple(job) if job else None
+
+    async def heartbeat(self, worker_id, mal_link):
+        """Extend the lease; returns False if the job is no longer held by this worker."""
+        now = time.time()
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "UPDATE metadata_jobs SET lease_expires = ?, updated_at = ? WHERE mal_link = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, mal_link, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    async def complete(self, worker_id, mal_link):
+        async with self._connect() as db:
+            await db.execute(
+                "UPDATE metadata_jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, last_error = NULL, updated_at = ? WHERE mal_link = ? AND lease_owner = ?",
+                (time.time(), mal_link, worker_id)
+            )
+
+    async def fail(self, worker_id, mal_link, error):
+        now = time.time()
+        async with self._connect() as db:
+            await db.execute(
+                """
+                UPDATE metadata_jobs
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?,
+                    not_before = ? + ? * (1 << (attempts - 1))
+                WHERE mal_link = ? AND lease_owner = ?
+                """,
+                (self.max_attempts, str(error), now, now, self.retry_base_seconds, mal_link, worker_id)
+            )
+
+    async def next_claimable(self, owner_prefix):
+        """Seconds until a job may become claimable, or None if there is nothing left to wait for.
+
+        Leases whose owner starts with ``owner_prefix`` (this process's workers) are ignored:
+        those workers either complete their job or fail it back to pending with a ``not_before``.
+        """
+        now = time.time()
+        async with self._connect() as db:
+            await self._ensure_table(db)
+            cursor = await db.execute(
+                """
+                SELECT MIN(CASE WHEN status = 'pending' THEN COALESCE(not_before, 0) ELSE lease_expires END)
+                FROM metadata_jobs
+                WHERE status = 'pending' OR (status = 'leased' AND substr(lease_owner, 1, ?) != ?)
+                """,
+                (len(owner_prefix), owner_prefix)
+            )
+            wake = (await cursor.fetchone())[0]
+        return None if wake is None else max(0.0, wake - now)
+
+    async def counts(self):
+        """Return {status: job count}."""
+        async with self._connect() as db:
+            await self._ensure_table(db)
+            cursor = await db.execute("SELECT status, COUNT(*) FROM metadata_jobs GROUP BY status")
+            return dict(await cursor.fetchall())
@@ -1,14 +1,29 @@
-import requests
+import aiohttp
+import asyncio
 from bs4 import BeautifulSoup
-import yaml
+from forum_parser import sections_of_kind
 from scraper import scrape_forum_post
+from storage import SnapshotStore
+from utils import MetadataCache, fetch_page, load_manual_overrides
+import logging
 import os
 
-def parse_show_page(url):
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+logger = logging.getLogger(__name__)
+
+# Upper bound on show pages being fetched at once; MAL_RATE_LIMITER still paces the requests
+MAX_CONCURRENT_FETCHES = int(os.getenv("MAX_CONCURRENT_FETCHES", "4"))
+
+# Parsed show pages by URL (memory only; the SQLite tier belongs to main.py's metadata table)
+SHOW_PAGE_CACHE = MetadataCache(db_path=None)
+
+METADATA_STORE = SnapshotStore("/data/metadata")
+
+def parse_show_page(html):
+    soup = BeautifulSoup(html, 'html.parser')
     data = {}
     info = soup.find("div", {"class": "leftside"})
+    if info is None:
+        raise ValueError("show page has no info sidebar")
     for span in info.find_all("span", {"class": "dark_text"}):
         key = span.text.strip(":")
         value = span.next_sibling.strip()
@@ -22,27 +37,59 @@ def parse_show_page(url):
             data[key] = value
     return data
 
-def update_metadata():
-    data = scrape_forum_post()
+async def fetch_show_page(session, semaphore, url):
+    async def fetch():
+        async with semaphore:
+            return parse_show_page(await fetch_page(session, url))
+    return await SHOW_PAGE_CACHE.get(url, fetch)
+
+async def fetch_show_pages(urls, concurrency=MAX_CONCURRENT_FETCHES):
+    """Fetch and parse show pages concurrently, returning {url: data} for the pages that succeeded."""
+    semaphore = asyncio.Semaphore(concurrency)
+    async with aiohttp.ClientSession() as session:
+        results = await asyncio.gather(*(fetch_show_page(session, semaphore, url) for url in urls), return_exceptions=True)
+    SHOW_PAGE_CACHE.log_stats()
+    pages = {}
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to fetch {url}: {result}")
+        else:
+            pages[url] = result
+    return pages
+
+def update_metadata(data=None, manual=None):
+    data = data or scrape_forum_post()
+    manual = load_manual_overrides() if manual is None else manual
     metadata = {}
-    manual = yaml.safe_load(open("data/manual_overrides.yaml")) or {}
-
-    for day, shows in data["sections"]["Currently Streaming SimulDubbed Anime"].items():
-        for show in shows:
-            mal_id = show["mal_id"]
-            metadata[mal_id] = parse_show_page(show["url"])
-            metadata[mal_id].update({
-                "ShowName": show["title"],
-                "LatestEpisode": show["current_episode"],
-                "TotalEpisodes": show["total_episodes"],
-                "AirDay": day,
-                "MAL_ID": mal_id
-            })
-            if mal_id in manual:
-                metadata[mal_id].update(manual[mal_id])
-
-    with open("/data/metadata.yaml", "w") as f:
-        yaml.safe_dump(metadata, f)
+    # Last saved entries, kept for shows whose page could not be fetched this run
+    previous = {mal_id: entry for entries in METADATA_STORE.load()[1].values() for mal_id, entry in entries.items()}
+
+    ongoing = [(day, show) for _, days in sections_of_kind(data["sections"], "ongoing") for day, shows in days.items() for show in shows if show["url"]]
+    pages = asyncio.run(fetch_show_pages(list(dict.fromkeys(show["url"] for _, show in ongoing))))
+
+    for day, show in ongoing:
+        mal_id = show["mal_id"]
+        if show["url"] in pages:
+            metadata[mal_id] = dict(pages[show["url"]])
+        elif mal_id in previous:
+            metadata[mal_id] = dict(previous[mal_id])
+        else:
+            continue
+        metadata[mal_id].update({
+            "ShowName": show["title"],
+            "LatestEpisode": show["current_episode"],
+            "TotalEpisodes": show["total_episodes"],
+            "AirDay": day,
+            "MAL_ID": mal_id
+        })
+        if mal_id in manual:
+            metadata[mal_id].update(manual[mal_id])
+
+    # One section per air day, so a changed show only rewrites that day's file
+    sections = {}
+    for mal_id, entry in metadata.items():
+        sections.setdefault(entry["AirDay"], {})[mal_id] = entry
+    METADATA_STORE.save({}, sections)
 
 if __name__ == "__main__":
-    update_metadata()
\ No newline at end of file
+    update_metadata()
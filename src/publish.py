@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+import yaml
+
+from storage import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Google Calendar batch requests accept at most 50 calls
+BATCH_SIZE = 50
+
+@dataclass(slots=True)
+class CalendarTarget:
+    """A calendar (Google Calendar ID and/or ICS file) and the filters deciding which events it gets.
+
+    Every filter that is set must match; unset filters match everything.
+    """
+    name: str
+    calendar_id: Optional[str] = None
+    ics: Optional[str] = None
+    providers: frozenset = frozenset()
+    genres: frozenset = frozenset()
+    exclude_genres: frozenset = frozenset()
+    demographics: frozenset = frozenset()
+    theatrical: Optional[bool] = None
+
+    def matches(self, event):
+        info = event.mal_info
+        if self.theatrical is not None and event.theatrical != self.theatrical:
+            return False
+        if self.providers:
+            offered = {p.lower() for p in info.streaming}
+            if event.provider:
+                offered.add(event.provider.lower())
+            if self.providers.isdisjoint(offered):
+                return False
+        if self.genres or self.exclude_genres:
+            tags = {g.lower() for g in (*info.genres, *info.theme)}
+            if self.genres and self.genres.isdisjoint(tags):
+                return False
+            if not self.exclude_genres.isdisjoint(tags):
+                return False
+        if self.demographics and info.demographic.lower() not in self.demographics:
+            return False
+        return True
+
+def _lowered(values):
+    return frozenset(value.lower() for value in values or ())
+
+def load_targets(path="data/calendar_targets.yaml"):
+    """Load publishing targets; without a config file, publish everything to $CALENDAR_ID."""
+    try:
+        with open(path, "r") as f:
+            config = yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        config = {"main": {"calendar_id_env": "CALENDAR_ID"}}
+
+    targets = []
+    for name, options in config.items():
+        calendar_id = options.get("calendar_id") or (os.getenv(options["calendar_id_env"]) if options.get("calendar_id_env") else None)
+        if not calendar_id and not options.get("ics"):
+            logger.warning(f"Target {name} has no calendar ID or ICS path; skipping")
+            continue
+        targets.append(CalendarTarget(
+            name=name,
+            calendar_id=calendar_id,
+            ics=options.get("ics"),
+            providers=_lowered(options.get("providers")),
+            genres=_lowered(options.get("genres")),
+            exclude_genres=_lowered(options.get("exclude_genres")),
+            demographics=_lowered(options.get("demographics")),
+            theatrical=options.get("theatrical")
+        ))
+    return targets
+
+def route_events(events, targets):
+    """Return {target name: [events]} from one pass over the event set."""
+    routed = {target.name: [] for target in targets}
+    for event in events:
+        for target in targets:
+            if target.matches(event):
+                routed[target.name].append(event)
+    return routed
+
+class RenderedEvents:
+    """Builds each event's API body, content hash and ICS text at most once, however many targets use it."""
+
+    def __init__(self):
+        self._bodies = {}
+        self._ics = {}
+
+    def body(self, event):
+        key = id(event)
+        if key not in self._bodies:
+            body = event.to_body()
+            body["id"] = event.uid
+            digest = hashlib.md5(repr(sorted(body.items())).encode()).hexdigest()
+            body["extendedProperties"] = {"private": {"contentHash": digest}}
+            self._bodies[key] = (body, digest)
+        return self._bodies[key]
+
+    def ics(self, event):
+        key = id(event)
+        if key not in self._ics:
+            self._ics[key] = event.to_ics(f"{event.uid}@anime-dub-calendar")
+        return self._ics[key]
+
+def _list_future_events(service, calendar_id, today):
+    existing = {}
+    page_token = None
+    while True:
+        response = service.events().list(
+            calendarId=calendar_id,
+            timeMin=f"{today.isoformat()}T00:00:00Z",
+            showDeleted=True,
+            pageToken=page_token
+        ).execute()
+        for item in response.get("items", []):
+            existing[item["id"]] = item
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return existing
+
+def _execute_batched(service, requests):
+    """Execute (kind, request) pairs in batches; returns {kind: failure count}.
+
+    Batches don't raise for individual requests, so failures are collected by callback.
+    """
+    failures = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            kind = request_id.split(":", 1)[0]
+            failures[kind] = failures.get(kind, 0) + 1
+            logger.error(f"Calendar {kind} request failed: {exception}")
+
+    for start in range(0, len(requests), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for n, (kind, request) in enumerate(requests[start:start + BATCH_SIZE], start):
+            batch.add(request, request_id=f"{kind}:{n}")
+        batch.execute()
+    return failures
+
+def sync_google_calendar(service, calendar_id, events, rendered, today=None):
+    """Make the calendar's events from today onwards match ``events``, touching only what changed."""
+    today = today or date.today()
+    existing = _list_future_events(service, calendar_id, today)
+    requests = []
+    desired = set()
+    counts = {"inserted": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0}
+
+    for event in events:
+        body, digest = rendered.body(event)
+        if body["id"] in desired:
+            continue
+        desired.add(body["id"])
+        current = existing.get(body["id"])
+        if current is None:
+            requests.append(("inserted", service.events().insert(calendarId=calendar_id, body=body)))
+            counts["inserted"] += 1
+        elif current.get("status") == "cancelled" or current.get("extendedProperties", {}).get("private", {}).get("contentHash") != digest:
+            # Re-using the ID of a deleted event requires an update rather than an insert
+            requests.append(("updated", service.events().update(calendarId=calendar_id, eventId=body["id"], body={**body, "status": "confirmed"})))
+            counts["updated"] += 1
+        else:
+            counts["unchanged"] += 1
+
+    for event_id, item in existing.items():
+        start = item.get("start", {}).get("date") or item.get("start", {}).get("dateTime", "")
+        if event_id not in desired and item.get("status") != "cancelled" and (start[:10] > today.isoformat() or item.get("recurrence")):
+            requests.append(("deleted", service.events().delete(calendarId=calendar_id, eventId=event_id)))
+            counts["deleted"] += 1
+
+    for kind, failed in _execute_batched(service, requests).items():
+        counts[kind] -= failed
+        counts["failed"] += failed
+    return counts
+
+def write_ics(path, name, events, rendered):
+    """Write the ICS file if its content changed; returns True when it was rewritten."""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//anime-dub-calendar//EN", "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{name}"]
+    seen = set()
+    for event in events:
+        if event.uid not in seen:
+            seen.add(event.uid)
+            lines.append(rendered.ics(event))
+    lines.append("END:VCALENDAR")
+    text = "\r\n".join(lines) + "\r\n"
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except FileNotFoundError:
+        pass
+    atomic_write(path, text)
+    return True
+
+def publish(events, targets, service=None):
+    """Route the event set to every target and sync each one."""
+    routed = route_events(events, targets)
+    rendered = RenderedEvents()
+    for target in targets:
+        target_events = routed[target.name]
+        if target.calendar_id:
+            if service:
+                counts = sync_google_calendar(service, target.calendar_id, target_events, rendered)
+                logger.info(f"Target {target.name}: {len(target_events)} events, Google Calendar {counts}")
+            else:
+                logger.warning(f"Target {target.name}: no Google Calendar service, skipping calendar sync")
+        if target.ics:
+            changed = write_ics(target.ics, target.name, target_events, rendered)
+            logger.info(f"Target {target.name}: {len(target_events)} events, {target.ics} {'rewritten' if changed else 'unchanged'}")
+    return routed
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+# DTSTAMP is fixed rather than the write time so unchanged events render to identical bytes
+ICS_DTSTAMP = "19700101T000000Z"
+
+def fold_ics_line(line, limit=75):
+    """Fold a content line at ``limit`` octets (RFC 5545 3.1) without splitting UTF-8 characters."""
+    if len(line.encode("utf-8")) <= limit:
+        return line
+    parts = []
+    current = ""
+    size = 0
+    for char in line:
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > limit:
+            parts.append(current)
+            # Continuation lines start with a space, which counts towards the limit
+            current = " "
+            size = 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return "\r\n".join(parts)
+
+def _intern_all(values):
+    return tuple(sys.intern(value) for value in values)
+
+@dataclass(slots=True)
+class Show:
+    name: str
+    section: str
+    mal_link: Optional[str] = None
+    day: Optional[str] = None
+    current: Optional[int] = None
+    total: Optional[int] = None
+    # Total listed as "???" (episode count not announced), as opposed to no total at all
+    total_unknown: bool = False
+    suspended: bool = False
+    date: Optional[str] = None
+    theatrical: bool = False
+
+    def __post_init__(self):
+        # Section and day names repeat across every show in the post
+        self.section = sys.intern(self.section)
+        if self.day:
+            self.day = sys.intern(self.day)
+
+    @property
+    def mal_id(self):
+        return self.mal_link.split("/")[4] if self.mal_link else None
+
+@dataclass(slots=True, frozen=True)
+class MalInfo:
+    streaming: tuple = ()
+    broadcast: str = ""
+    producers: tuple = ()
+    studios: tuple = ()
+    source: str = ""
+    genres: tuple = ()
+    theme: tuple = ()
+    demographic: str = ""
+    duration: str = ""
+    rating: str = "Not Listed"
+
+    @classmethod
+    def create(cls, streaming=(), broadcast="", producers=(), studios=(), source="", genres=(), theme=(), demographic="", duration="", rating="Not Listed"):
+        """Build a MalInfo with provider/genre-like strings interned, since they repeat across shows."""
+        return cls(
+            streaming=_intern_all(streaming),
+            broadcast=broadcast,
+            producers=_intern_all(producers),
+            studios=_intern_all(studios),
+            source=sys.intern(source),
+            genres=_intern_all(genres),
+            theme=_intern_all(theme),
+            demographic=sys.intern(demographic),
+            duration=sys.intern(duration),
+            rating=sys.intern(rating)
+        )
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a metadata row (without mal_link), decoding the JSON list columns."""
+        streaming, broadcast, producers, studios, source, genres, theme, demographic, duration, rating = row
+        return cls.create(
+            streaming=json.loads(streaming) if streaming else (),
+            broadcast=broadcast or "",
+            producers=json.loads(producers) if producers else (),
+            studios=json.loads(studios) if studios else (),
+            source=source or "",
+            genres=json.loads(genres) if genres else (),
+            theme=json.loads(theme) if theme else (),
+            demographic=demographic or "",
+            duration=duration or "",
+            rating=rating or ""
+        )
+
+    def to_row(self, mal_link):
+        return (
+            mal_link,
+            json.dumps(list(self.streaming)),
+            self.broadcast,
+            json.dumps(list(self.producers)),
+            json.dumps(list(self.studios)),
+            self.source,
+            json.dumps(list(self.genres)),
+            json.dumps(list(self.theme)),
+            self.demographic,
+            self.duration,
+            self.rating
+        )
+
+    def description_lines(self):
+        lines = [f"Rating: {self.rating or 'Not Listed'}"]
+        if self.streaming:
+            lines.append(f"Streaming: {', '.join(self.streaming)}")
+        if self.broadcast:
+            lines.append(f"Broadcast: {self.broadcast}")
+        if self.genres:
+            lines.append(f"Genres: {', '.join(self.genres)}")
+        if self.theme:
+            lines.append(f"Theme: {', '.join(self.theme)}")
+        if self.studios:
+            lines.append(f"Studios: {', '.join(self.studios)}")
+        if self.producers:
+            lines.append(f"Producers: {', '.join(self.producers)}")
+        if self.source:
+            lines.append(f"Source: {self.source}")
+        if self.demographic:
+            lines.append(f"Demographic: {self.demographic}")
+        if self.duration:
+            lines.append(f"Duration: {self.duration}")
+        return lines
+
+EMPTY_MAL_INFO = MalInfo()
+
+@dataclass(slots=True)
+class CalendarEvent:
+    """An all-day calendar event; the API/ICS body is only built when it is written."""
+    summary: str
+    date: object
+    color_id: str
+    mal_info: MalInfo = EMPTY_MAL_INFO
+    # Lines placed before the MAL details in the description
+    notes: tuple = ()
+    recurrence: Optional[str] = None
+    # Routing attributes for per-target filtering
+    provider: Optional[str] = None
+    theatrical: bool = False
+
+    @property
+    def uid(self):
+        """Stable ID across runs; recurring events keep theirs as their start date moves."""
+        anchor = self.recurrence or self.date.isoformat()
+        return hashlib.md5(f"{self.summary}|{anchor}".encode()).hexdigest()
+
+    @property
+    def description(self):
+        return "\n".join((*self.notes, *self.mal_info.description_lines()))
+
+    def to_body(self):
+        """Google Calendar API event body."""
+        body = {
+            "summary": self.summary,
+            "description": self.description,
+            "start": {"date": self.date.strftime("%Y-%m-%d")},
+            # All-day end dates are exclusive
+            "end": {"date": (self.date + timedelta(days=1)).strftime("%Y-%m-%d")},
+            "colorId": self.color_id
+        }
+        if self.recurrence:
+            body["recurrence"] = [self.recurrence]
+        return body
+
+    def to_ics(self, uid):
+        """iCalendar VEVENT lines."""
+        def escape(text):
+            return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:{uid}",
+            f"DTSTAMP:{ICS_DTSTAMP}",
+            f"DTSTART;VALUE=DATE:{self.date.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{(self.date + timedelta(days=1)).strftime('%Y%m%d')}",
+            f"SUMMARY:{escape(self.summary)}",
+            f"DESCRIPTION:{escape(self.description)}"
+        ]
+        if self.recurrence:
+            lines.append(self.recurrence)
+        lines.append("END:VEVENT")
+        return "\r\n".join(fold_ics_line(line) for line in lines)
@@ -2,9 +2,11 @@ import requests
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime, timedelta
-import yaml
+from forum_parser import parse_forum_post, section_kind
+from storage import SnapshotStore
 
 FORUM_URL = "https://myanimelist.net/forum/?topicid=1692966"
+PARSED_DATA_STORE = SnapshotStore("data/parsed_data")
 
 def scrape_forum_post():
     response = requests.get(FORUM_URL)
@@ -18,45 +20,21 @@ def scrape_forum_post():
     last_updated = post.find("b", text=re.compile("Last Updated:")).next_sibling.strip()
 
     # Parse anime lists
-    content = post.find("td").text
-    sections = {
-        "Currently Streaming SimulDubbed Anime": {},
-        "Upcoming SimulDubbed Anime for Winter 2025": [],
-        "Upcoming SimulDubbed Anime for Spring 2025": [],
-        "Upcoming Dubbed Anime": [],
-        "Released Dubbed Anime Awaiting Streaming": [],
-        "Announced Dubbed Anime": [],
-        "Released Dubbed Anime": [],
-        "Finished SimulDubbed Anime": []
-    }
-
-    current_day = None
-    for line in content.split("\n"):
-        line = line.strip()
-        if line.startswith("Monday") or line.startswith("Tuesday") or line.startswith("Wednesday") or \
-           line.startswith("Thursday") or line.startswith("Friday") or line.startswith("Saturday") or \
-           line.startswith("Sunday"):
-            current_day = line.split()[0]
-            sections["Currently Streaming SimulDubbed Anime"][current_day] = []
-        elif line.startswith("<li>") and current_day:
-            match = re.search(r'<a href="(https://myanimelist.net/anime/\d+/[^"]+)" rel="nofollow">([^<]+)</a> \(Episodes: (\d+)(?:/(\d+|\?+|\w+))?\)', line)
-            if match:
-                url, title, ep_current, ep_total = match.groups()
-                sections["Currently Streaming SimulDubbed Anime"][current_day].append({
-                    "title": title,
-                    "url": url,
-                    "mal_id": url.split("/")[4],
-                    "current_episode": int(ep_current),
-                    "total_episodes": ep_total if ep_total and ep_total.isdigit() else None,
-                    "suspended": "**" in line
+    sections = {}
+    for name, shows in parse_forum_post(post).sections.items():
+        if section_kind(name) == "ongoing":
+            sections[name] = {}
+            for show in shows:
+                sections[name].setdefault(show.day, []).append({
+                    "title": show.name,
+                    "url": show.mal_link,
+                    "mal_id": show.mal_id,
+                    "current_episode": show.current,
+                    "total_episodes": show.total,
+                    "suspended": show.suspended
                 })
-        elif any(section in line for section in sections) and "Currently Streaming" not in line:
-            current_section = next(s for s in sections if s in line)
-        elif line.startswith("<li>") and current_section != "Currently Streaming SimulDubbed Anime":
-            match = re.search(r'([^<]+) - (\w+ \d+, \d+)(?:\*)?', line)
-            if match:
-                title, date = match.groups()
-                sections[current_section].append({"title": title.strip(), "date": date})
+        else:
+            sections[name] = [{"title": show.name, "url": show.mal_link, "date": show.date, "theatrical": show.theatrical} for show in shows]
 
     return {
         "mod_time": mod_time,
@@ -65,15 +43,15 @@ def scrape_forum_post():
     }
 
 def load_cached_data():
-    try:
-        with open("data/parsed_data.yaml", "r") as f:
-            return yaml.safe_load(f) or {}
-    except FileNotFoundError:
+    meta, sections = PARSED_DATA_STORE.load()
+    if not sections:
         return {}
+    return {**meta, "sections": sections}
 
 def save_cached_data(data):
-    with open("data/parsed_data.yaml", "w") as f:
-        yaml.safe_dump(data, f)
+    """Persist the scrape; returns the names of the sections that changed."""
+    meta = {key: value for key, value in data.items() if key != "sections"}
+    return PARSED_DATA_STORE.save(meta, data["sections"])
 
 def needs_update(cached, new):
     return cached.get("mod_time") != new["mod_time"] or cached.get("last_updated") != new["last_updated"]
\ No newline at end of file
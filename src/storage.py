@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+
+def atomic_write(path, text):
+    """Write text to path via a fsync'd temp file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+def section_filenames(names):
+    """Return {name: file name}; headings sharing a slug all get a hash suffix, whatever their order."""
+    slugs = {name: _slug(name) for name in names}
+    counts = Counter(slugs.values())
+    return {
+        name: f"{slug}-{hashlib.sha256(name.encode('utf-8')).hexdigest()[:8]}.json" if counts[slug] > 1 else f"{slug}.json"
+        for name, slug in slugs.items()
+    }
+
+class SnapshotStore:
+    """A document stored as one JSON file per section plus a manifest.
+
+    The manifest holds the top-level metadata and a hash per section, so
+    ``save`` only rewrites the sections whose content actually changed.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, filename):
+        return os.path.join(self.root, filename)
+
+    def _load_manifest(self):
+        try:
+            with open(self._path(MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"meta": {}, "sections": {}}
+
+    def load(self):
+        """Return (meta, sections) as last saved, or ({}, {}) if nothing is stored yet."""
+        manifest = self._load_manifest()
+        sections = {}
+        for name, entry in manifest["sections"].items():
+            try:
+                with open(self._path(entry["file"]), "r", encoding="utf-8") as f:
+                    sections[name] = json.load(f)
+            except FileNotFoundError:
+                # Treated as not cached; the next save rewrites it
+                logger.warning(f"{self.root}: section file {entry['file']} for {name} is missing")
+        return manifest["meta"], sections
+
+    def save(self, meta, sections):
+        """Write changed sections and the manifest; returns the names of sections rewritten or removed."""
+        manifest = self._load_manifest()
+        old_sections = manifest["sections"]
+        new_sections = {}
+        changed = []
+        filenames = section_filenames(sections)
+
+        for name, value in sections.items():
+            text = json.dumps(value, indent=1, ensure_ascii=False, sort_keys=True) + "\n"
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            entry = {"file": filenames[name], "hash": digest}
+            new_sections[name] = entry
+            if old_sections.get(name) != entry or not os.path.exists(self._path(entry["file"])):
+                atomic_write(self._path(entry["file"]), text)
+                changed.append(name)
+
+        # Remove every old file no section uses any more, including ones whose section was renamed on disk
+        used = set(filenames.values())
+        for name, entry in old_sections.items():
+            if entry["file"] not in used:
+                try:
+                    os.unlink(self._path(entry["file"]))
+                except FileNotFoundError:
+                    pass
+            if name not in new_sections:
+                changed.append(name)
+
+        new_manifest = {"meta": meta, "sections": new_sections}
+        if changed or new_manifest != manifest:
+            atomic_write(self._path(MANIFEST), json.dumps(new_manifest, indent=1, ensure_ascii=False, sort_keys=True) + "\n")
+        logger.info(f"Saved {self.root}: {len(changed)} of {len(new_sections)} sections changed {changed}")
+        return changed
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import aiosqlite
+import yaml
+
+from records import MalInfo
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
+
+METADATA_COLUMNS = ["mal_link", "streaming", "broadcast", "producers", "studios", "source", "genres", "theme", "demographic", "duration", "rating"]
+
+METADATA_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS metadata (
+        mal_link TEXT PRIMARY KEY,
+        streaming TEXT,
+        broadcast TEXT,
+        producers TEXT,
+        studios TEXT,
+        source TEXT,
+        genres TEXT,
+        theme TEXT,
+        demographic TEXT,
+        duration TEXT,
+        rating TEXT,
+        fetched_at REAL
+    )
+"""
+
+async def ensure_metadata_table(db):
+    await db.execute(METADATA_SCHEMA)
+    # Databases created before fetched_at existed need the column added
+    cursor = await db.execute("PRAGMA table_info(metadata)")
+    columns = {row[1] for row in await cursor.fetchall()}
+    if "fetched_at" not in columns:
+        await db.execute("ALTER TABLE metadata ADD COLUMN fetched_at REAL")
+
+class MetadataCache:
+    """Two-tier cache for MAL metadata.
+
+    Tier one is an in-memory LRU bounded by ``max_entries`` and ``ttl`` seconds.
+    Tier two is the SQLite ``metadata`` table of MalInfo rows (skipped when ``db_path`` is None).
+    Concurrent ``get`` calls for the same key share a single fetch.
+    """
+
+    def __init__(self, db_path="shows.db", max_entries=512, ttl=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._inflight = {}  # key -> asyncio.Task
+        self.stats = {"hits": 0, "db_hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expired": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _get_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key, value, stored_at=None):
+        self._entries[key] = (stored_at or time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    async def _get_db(self, key):
+        if not self.db_path:
+            return None
+        async with aiosqlite.connect(self.db_path) as db:
+            await ensure_metadata_table(db)
+            await db.commit()
+            cursor = await db.execute(f"SELECT {', '.join(METADATA_COLUMNS[1:])}, fetched_at FROM metadata WHERE mal_link = ?", (key,))
+            row = await cursor.fetchone()
+        if row is None or row[-1] is None or time.time() - row[-1] > self.ttl:
+            return None
+        return row[-1], MalInfo.from_row(row[:-1])
+
+    async def _put_db(self, key, value):
+        if not self.db_path:
+            return
+        async with aiosqlite.connect(self.db_path) as db:
+            await ensure_metadata_table(db)
+            await db.execute(
+                f"INSERT OR REPLACE INTO metadata ({', '.join(METADATA_COLUMNS)}, fetched_at) VALUES ({', '.join('?' * (len(METADATA_COLUMNS) + 1))})",
+                value.to_row(key) + (time.time(),)
+            )
+            await db.commit()
+
+    async def _load(self, key, fetch):
+        cached = await self._get_db(key)
+        if cached is not None:
+            self.stats["db_hits"] += 1
+            stored_at, value = cached
+            self._put_memory(key, value, stored_at)
+            return value
+        self.stats["misses"] += 1
+        value = await fetch()
+        if value is not None:
+            self._put_memory(key, value)
+            await self._put_db(key, value)
+        return value
+
+    def _finish_load(self, key, task):
+        del self._inflight[key]
+        # Mark failures retrieved so ones whose callers were all cancelled don't log "exception never retrieved"
+        if not task.cancelled():
+            task.exception()
+
+    async def get(self, key, fetch):
+        """Return the cached value for key, calling ``await fetch()`` on a miss."""
+        value = self._get_memory(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            # The load runs as its own task so cancelling one caller doesn't cancel it for the others
+            task = asyncio.ensure_future(self._load(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_load(key, done))
+        return await asyncio.shield(task)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
+
+    def log_stats(self):
+        logger.info(f"Metadata cache: {len(self._entries)}/{self.max_entries} entries, stats {self.stats}")
+
+class RateLimiter:
+    """Spaces requests so that at most ``rate`` start per second across all callers."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def __aenter__(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_slot > now:
+                await asyncio.sleep(self._next_slot - now)
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+    async def __aexit__(self, *exc):
+        return False
+
+# Shared by every MAL request in the process so parallel fetchers don't trip MAL's rate limit.
+# MAL_RATE_LIMIT is the budget across all processes; each of MAL_WORKER_PROCESSES takes an equal share.
+MAL_RATE_LIMITER = RateLimiter(float(os.getenv("MAL_RATE_LIMIT", "2")) / int(os.getenv("MAL_WORKER_PROCESSES", "1")))
+
+async def fetch_page(session, url, limiter=MAL_RATE_LIMITER):
+    async with limiter:
+        async with session.get(url, headers=HEADERS) as response:
+            # Raise on 429/403/5xx so error pages are never parsed and cached as real data
+            response.raise_for_status()
+            return await response.text()
+
+def load_manual_overrides(path="data/manual_overrides.yaml"):
+    """Load manual overrides keyed by MAL ID."""
+    try:
+        with open(path, "r") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}